@@ -1,11 +1,19 @@
 import streamlit as st
+import hashlib
+import heapq
+import io
 import tempfile
 import os
 from datetime import datetime
-from log_parser import DockerLogParser
+from typing import Dict, List, Optional, Tuple, Union
+from log_parser import BuildStep, DockerLogParser
 from visualizer import BuildWaterfallVisualizer
 
 
+# Rows shown in the detailed step table before the user asks for more
+MAX_TABLE_ROWS = 200
+
+
 def main():
     st.set_page_config(
         page_title="Docker Build Waterfall Viewer",
@@ -54,16 +62,23 @@ def main():
     
     # Process uploaded file
     if uploaded_file is not None:
-        content = uploaded_file.read().decode('utf-8')
-        process_logs(content, show_cached, highlight_bottlenecks, bottleneck_threshold)
+        process_logs(uploaded_file.getvalue(), show_cached, highlight_bottlenecks, bottleneck_threshold)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def parse_log_content(content: Union[str, bytes]) -> List[BuildStep]:
+    """Parse log content, memoised on the content so option changes don't re-parse."""
+    if isinstance(content, bytes):
+        # Decode and parse line by line instead of building one big string
+        log_stream = io.TextIOWrapper(io.BytesIO(content), encoding='utf-8', newline='')
+        return DockerLogParser().parse_logs(log_stream)
+    return DockerLogParser().parse_logs(content)
 
 
-def process_logs(content: str, show_cached: bool, highlight_bottlenecks: bool, bottleneck_threshold: int):
+def process_logs(content: Union[str, bytes], show_cached: bool, highlight_bottlenecks: bool, bottleneck_threshold: int):
     """Process log content and display visualization."""
-    parser = DockerLogParser()
-    
     with st.spinner("Parsing Docker build logs..."):
-        steps = parser.parse_logs(content)
+        steps = parse_log_content(content)
         
     if not steps:
         st.error("No build steps found in the log file. Please check the format.")
@@ -74,20 +89,28 @@ def process_logs(content: str, show_cached: bool, highlight_bottlenecks: bool, b
         steps = [s for s in steps if not s.is_cached]
         
     # Detect parallelism
+    parser = DockerLogParser()
     parallel_groups = parser.detect_parallelism(steps)
     
     # Identify bottlenecks
     bottlenecks = parser.identify_bottlenecks(steps, bottleneck_threshold) if highlight_bottlenecks else []
     
+    # Collect statistics in a single pass
+    cached_count = 0
+    total_duration = 0.0
+    for step in steps:
+        if step.is_cached:
+            cached_count += 1
+        else:
+            total_duration += step.duration or 0
+        
     # Display statistics
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Total Steps", len(steps))
     with col2:
-        cached_count = len([s for s in steps if s.is_cached])
         st.metric("Cached Steps", cached_count)
     with col3:
-        total_duration = sum(s.duration or 0 for s in steps if not s.is_cached)
         st.metric("Total Build Time", f"{total_duration:.2f}s")
     with col4:
         st.metric("Bottlenecks", len(bottlenecks))
@@ -95,9 +118,13 @@ def process_logs(content: str, show_cached: bool, highlight_bottlenecks: bool, b
     # Create visualization
     st.subheader("Build Waterfall Chart")
     
-    visualizer = BuildWaterfallVisualizer()
-    fig = visualizer.create_waterfall_chart(steps, parallel_groups, bottlenecks)
-    visualizer.add_statistics_panel(steps)
+    # Keep the visualizer across reruns so option changes that only affect
+    # colors update the existing figure instead of rebuilding it
+    visualizer = st.session_state.setdefault('visualizer', BuildWaterfallVisualizer())
+    previous_fig = visualizer.fig
+    fig = visualizer.update(steps, parallel_groups, bottlenecks)
+    if fig is not previous_fig:
+        visualizer.add_statistics_panel(steps)
     
     st.plotly_chart(fig, use_container_width=True)
     
@@ -127,16 +154,51 @@ def process_logs(content: str, show_cached: bool, highlight_bottlenecks: bool, b
     
     # Detailed step information
     with st.expander("📋 Detailed Step Information"):
-        step_data = []
-        for step in steps:
-            step_data.append({
-                "Step ID": step.step_id,
-                "Description": step.description[:80] + "..." if len(step.description) > 80 else step.description,
-                "Duration (s)": f"{step.duration:.2f}" if step.duration else "N/A",
-                "Cached": "✓" if step.is_cached else "✗",
-                "Type": step.step_type
-            })
-        st.dataframe(step_data)
+        # Table rows are only gathered here; formatting happens in the cached
+        # build_step_table for the rows that are actually shown
+        step_rows = tuple(
+            (step.step_id, step.description, step.duration, step.is_cached, step.step_type)
+            for step in steps
+        )
+        row_limit = len(step_rows)
+        if row_limit > MAX_TABLE_ROWS:
+            row_limit = st.slider(
+                "Longest steps to show",
+                min_value=MAX_TABLE_ROWS,
+                max_value=len(step_rows),
+                value=MAX_TABLE_ROWS
+            )
+        # Key the table cache on a digest of the log rather than letting
+        # Streamlit hash every row on each rerun
+        raw = content if isinstance(content, bytes) else content.encode('utf-8')
+        content_key = (hashlib.sha1(raw).hexdigest(), show_cached)
+        st.dataframe(build_step_table(content_key, step_rows, row_limit))
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_step_table(content_key: Tuple[str, bool],
+                     _step_rows: Tuple[Tuple[str, str, Optional[float], bool, str], ...],
+                     limit: int) -> List[Dict[str, str]]:
+    """Build the detailed step table, keeping only the `limit` longest steps.
+    
+    Cached on `content_key`, which identifies the rows; `_step_rows` is
+    left out of the cache key.
+    """
+    step_rows = _step_rows
+    if len(step_rows) > limit:
+        longest = heapq.nlargest(limit, range(len(step_rows)), key=lambda i: step_rows[i][2] or 0)
+        step_rows = tuple(step_rows[i] for i in sorted(longest))
+        
+    return [
+        {
+            "Step ID": step_id,
+            "Description": description[:80] + "…" if len(description) > 80 else description,
+            "Duration (s)": f"{duration:.2f}" if duration else "N/A",
+            "Cached": "✓" if is_cached else "✗",
+            "Type": step_type
+        }
+        for step_id, description, duration, is_cached, step_type in step_rows
+    ]
 
 
 def load_buildkit_example() -> str:
@@ -27,9 +27,8 @@ def debug_parse():
     # Test timestamp extraction
     print("\n=== Timestamp Extraction Test ===")
     for i, line in enumerate(lines[:3]):
-        timestamp = parser._extract_timestamp(line)
+        timestamp, cleaned = parser._split_timestamp(line)
         print(f"Line {i}: {timestamp}")
-        cleaned = parser.TIMESTAMP_PATTERN.sub('', line)
         print(f"  Cleaned: {cleaned}")
     
     # Test pattern matching
@@ -40,11 +39,12 @@ def debug_parse():
         ("BUILDKIT_CACHED", parser.BUILDKIT_CACHED_PATTERN),
         ("BUILDKIT_SIMPLE", parser.BUILDKIT_SIMPLE_PATTERN),
     ]
+    split_timestamp = parser._split_timestamp
     
     for line_num in [0, 1, 2, 4, 13, 32]:  # Test specific lines
         if line_num < len(lines):
             line = lines[line_num]
-            cleaned = parser.TIMESTAMP_PATTERN.sub('', line).strip()
+            cleaned = split_timestamp(line)[1].strip()
             print(f"\nLine {line_num}: {cleaned[:80]}...")
             
             for pattern_name, pattern in test_patterns:
@@ -72,24 +72,25 @@ def debug_parse():
         parser_debug.is_buildkit = True
         step_info = {}
         
+        # Patterns to try, in the order the parser tries them
+        patterns = [
+            ("CACHED", parser_debug.BUILDKIT_CACHED_PATTERN),
+            ("START", parser_debug.BUILDKIT_START_PATTERN),
+            ("DONE", parser_debug.BUILDKIT_DONE_PATTERN),
+            ("SIMPLE", parser_debug.BUILDKIT_SIMPLE_PATTERN),
+            ("PROGRESS", parser_debug.BUILDKIT_PROGRESS_PATTERN),
+        ]
+        split_timestamp = parser_debug._split_timestamp
+        
         for i, line in enumerate(lines[:20]):
             line = line.strip()
             if not line:
                 continue
             
             # Remove timestamp
-            cleaned = parser_debug.TIMESTAMP_PATTERN.sub('', line).strip()
+            cleaned = split_timestamp(line)[1].strip()
             print(f"\nLine {i}: {cleaned[:60]}...")
             
-            # Try all patterns
-            patterns = [
-                ("CACHED", parser_debug.BUILDKIT_CACHED_PATTERN),
-                ("START", parser_debug.BUILDKIT_START_PATTERN),
-                ("DONE", parser_debug.BUILDKIT_DONE_PATTERN),
-                ("SIMPLE", parser_debug.BUILDKIT_SIMPLE_PATTERN),
-                ("PROGRESS", parser_debug.BUILDKIT_PROGRESS_PATTERN),
-            ]
-            
             matched = False
             for pattern_name, pattern in patterns:
                 match = pattern.match(cleaned)
@@ -1,11 +1,29 @@
 import re
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Optional
+from functools import lru_cache
+from itertools import chain, islice
+from operator import itemgetter
+from typing import Iterable, List, Dict, Set, Tuple, Optional, Union
 from dataclasses import dataclass
+import numpy as np
 from dateutil import parser as date_parser
 
 
-@dataclass
+@lru_cache(maxsize=1024)
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse an ISO-8601 timestamp, falling back to dateutil for other variants."""
+    try:
+        # fromisoformat is implemented in C but only accepts 'Z' from Python 3.11
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        pass
+    try:
+        return date_parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+
+
+@dataclass(slots=True)
 class BuildStep:
     """Represents a single Docker build step."""
     step_id: str
@@ -16,9 +34,15 @@ class BuildStep:
     step_type: str
     layer_info: Optional[str]
     is_cached: bool = False
-    parent_steps: List[str] = None
+    parent_steps: Optional[List[str]] = None
+    # Start/end as float seconds since the build start, set by parse_logs.
+    # has_offsets records that they were computed, as they stay None for
+    # steps that can't be placed on the build timeline.
+    start_s: Optional[float] = None
+    end_s: Optional[float] = None
+    has_offsets: bool = False
     
-    def __post_init__(self):
+    def __post_init__(self) -> None:
         if self.parent_steps is None:
             self.parent_steps = []
 
@@ -43,19 +67,24 @@ class DockerLogParser:
     BUILDKIT_SIMPLE_PATTERN = re.compile(
         r'#(\d+)\s+\[([^\]]+)\]\s+(.+?)$'
     )
-    BUILDKIT_EXTRACTING_PATTERN = re.compile(
-        r'#(\d+)\s+extracting\s+(.+?)(?:\s+(\d+\.\d+s))?'
-    )
-    BUILDKIT_LOADING_PATTERN = re.compile(
-        r'#(\d+)\s+loading\s+(.+?)'
-    )
-    # Pattern for transferring, writing, etc.
-    BUILDKIT_TRANSFERRING_PATTERN = re.compile(
-        r'#(\d+)\s+(transferring|writing|preparing|sha256:[a-f0-9]+)\s+(.+?)$'
-    )
-    # Pattern for continuation lines
-    BUILDKIT_CONTINUATION_PATTERN = re.compile(
-        r'#(\d+)\s+\.\.\.$'
+    # The patterns above, plus extracting/loading/transferring/continuation
+    # lines, as one alternation tried in the same order. It is used with
+    # fullmatch(), so no trailing '$' and trailing descriptions can be
+    # greedy. Each alternative is wrapped in a named group so
+    # ``match.lastgroup`` says which one matched.
+    BUILDKIT_LINE_PATTERN = re.compile(
+        r'#(?P<id>\d+)\s+(?:'
+        r'(?P<cached>CACHED(?:\s+\[(?P<cached_type>[^\]]+)\s+(?P<cached_layer>\d+/\d+)\]\s+(?P<cached_desc>.+))?)'
+        r'|(?P<start>\[(?P<start_type>[^\]]+)\s+(?P<start_layer>\d+/\d+)\]\s+(?P<start_desc>.+?)(?:\s+\d+\.\d+s)?)'
+        r'|(?P<done>DONE\s+(?P<done_duration>\d+\.\d+s))'
+        r'|(?P<progress>\d+\.\d+s\s+.+)'
+        r'|(?P<simple>\[(?P<simple_type>[^\]]+)\]\s+(?P<simple_desc>.+))'
+        # extracting/loading only ever matched a prefix, '.*' keeps that behaviour
+        r'|(?P<extracting>extracting\s+.+?(?:\s+(?P<extracting_duration>\d+\.\d+s))?.*)'
+        r'|(?P<loading>loading\s+.+)'
+        r'|(?P<transferring>(?:transferring|writing|preparing|sha256:[a-f0-9]+)\s+.+)'
+        r'|(?P<continuation>\.\.\.)'
+        r')'
     )
     
     # Legacy Docker patterns
@@ -69,70 +98,111 @@ class DockerLogParser:
         r'---> Running in ([a-f0-9]+)'
     )
     
+    # Above this many steps detect_parallelism uses a sweep line instead of
+    # an N x N NumPy overlap matrix
+    PARALLELISM_MATRIX_LIMIT = 2000
+    
+    # Numeric part of a step ID ('#12', 'Step 3')
+    STEP_NUMBER_PATTERN = re.compile(r'\d+')
+    
     # Timestamp patterns
     TIMESTAMP_PATTERN = re.compile(
         r'^(\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})?)\s+'
     )
     
-    def __init__(self):
+    def __init__(self) -> None:
         self.steps: Dict[str, BuildStep] = {}
         self.build_start_time: Optional[datetime] = None
         self.is_buildkit = False
-        self.relative_time_counter = 0
+        self.relative_time_counter = 0.0
         
-    def parse_logs(self, log_content: str) -> List[BuildStep]:
-        """Parse Docker build logs and extract build steps."""
-        lines = log_content.strip().split('\n')
+    def parse_logs(self, log_content: Union[str, Iterable[str]]) -> List[BuildStep]:
+        """Parse Docker build logs and extract build steps.
         
-        # Detect BuildKit vs legacy format
-        self._detect_format(lines)
+        Accepts the whole log as a string or any iterable of lines, such as an
+        open text file, which is consumed lazily.
+        """
+        # splitlines() avoids copying the whole log for strip() and also
+        # handles '\r\n' line endings; blank lines are skipped while parsing
+        if isinstance(log_content, str):
+            log_content = log_content.splitlines()
+        line_iter = iter(log_content)
+        
+        # Detect BuildKit vs legacy format from the first lines, then put them
+        # back in front of the rest
+        head = list(islice(line_iter, 20))
+        self._detect_format(head)
+        lines = chain(head, line_iter)
         
         if self.is_buildkit:
-            return self._parse_buildkit_logs(lines)
+            steps = self._parse_buildkit_logs(lines)
         else:
-            return self._parse_legacy_logs(lines)
+            steps = self._parse_legacy_logs(lines)
+            
+        self._set_time_offsets(steps)
+        return steps
     
     def _detect_format(self, lines: List[str]) -> None:
         """Detect whether logs are in BuildKit or legacy format."""
-        for line in lines[:20]:  # Check first 20 lines
-            # Remove timestamp if present
-            cleaned_line = self.TIMESTAMP_PATTERN.sub('', line).strip()
-            if cleaned_line.startswith('#') and ('DONE' in cleaned_line or 'CACHED' in cleaned_line or '[' in cleaned_line):
-                self.is_buildkit = True
-                return
-        self.is_buildkit = False
+        # Check first 20 lines, stopping at the first BuildKit line
+        self.is_buildkit = any(self._is_buildkit_line(line) for line in lines[:20])
+    
+    def _is_buildkit_line(self, line: str) -> bool:
+        """Check whether a single log line looks like BuildKit output."""
+        if '#' not in line:
+            return False
+            
+        # Only try the timestamp regex when the line doesn't start with '#'
+        cleaned_line = line.strip()
+        if not cleaned_line.startswith('#'):
+            match = self.TIMESTAMP_PATTERN.match(line)
+            if not match:
+                return False
+            cleaned_line = line[match.end():].strip()
+        return cleaned_line.startswith('#') and ('DONE' in cleaned_line or 'CACHED' in cleaned_line or '[' in cleaned_line)
     
-    def _parse_buildkit_logs(self, lines: List[str]) -> List[BuildStep]:
+    def _parse_buildkit_logs(self, lines: Iterable[str]) -> List[BuildStep]:
         """Parse BuildKit format logs."""
-        step_start_times = {}
-        step_info = {}
+        step_start_times: Dict[str, datetime] = {}
+        step_info: Dict[str, BuildStep] = {}
         
         for line in lines:
             line = line.strip()
             if not line:
                 continue
                 
-            # Extract timestamp if present
-            timestamp = self._extract_timestamp(line)
+            # Extract timestamp if present and remove it for pattern matching
+            timestamp, line = self._split_timestamp(line)
             if timestamp and not self.build_start_time:
                 self.build_start_time = timestamp
             
-            # Remove timestamp from line for pattern matching
-            line = self.TIMESTAMP_PATTERN.sub('', line)
+            # Every BuildKit pattern starts with '#N', skip plain output lines
+            if not line.startswith('#'):
+                continue
+                
+            # Match all BuildKit patterns in one pass and dispatch on the
+            # alternative that matched
+            match = self.BUILDKIT_LINE_PATTERN.fullmatch(line)
+            if match is None:
+                # Fallback for any #N lines we haven't caught
+                self._add_fallback_step(line, timestamp, step_info)
+                continue
             
-            # Match BuildKit patterns
-            if match := self.BUILDKIT_CACHED_PATTERN.match(line):
-                step_id = f"#{match.group(1)}"
+            # Progress, loading, transferring and continuation lines belong to
+            # an existing step and carry nothing we record
+            kind = match.lastgroup
+            if kind == 'cached':
+                step_id = f"#{match.group('id')}"
                 # CACHED can appear with or without additional info
-                if match.group(2):  # Has full info
+                if match.group('cached_type'):  # Has full info
                     step_info[step_id] = BuildStep(
                         step_id=step_id,
-                        description=match.group(4) if match.group(4) else "CACHED",
+                        description=match.group('cached_desc') if match.group('cached_desc') else "CACHED",
                         start_time=timestamp or self.build_start_time or datetime.now(),
                         end_time=timestamp or self.build_start_time or datetime.now(),
                         duration=0.0,
-                        step_type=match.group(2),
-                        layer_info=match.group(3),
+                        step_type=match.group('cached_type'),
+                        layer_info=match.group('cached_layer'),
                         is_cached=True
                     )
                 else:  # Just "#N CACHED"
@@ -141,24 +211,24 @@ class DockerLogParser:
                         step_info[step_id].duration = 0.0
                         step_info[step_id].end_time = step_info[step_id].start_time
                 
-            elif match := self.BUILDKIT_START_PATTERN.match(line):
-                step_id = f"#{match.group(1)}"
+            elif kind == 'start':
+                step_id = f"#{match.group('id')}"
                 if step_id not in step_start_times:
                     step_start_times[step_id] = timestamp or self.build_start_time or datetime.now()
                     step_info[step_id] = BuildStep(
                         step_id=step_id,
-                        description=match.group(4),
+                        description=match.group('start_desc'),
                         start_time=step_start_times[step_id],
                         end_time=None,
                         duration=None,
-                        step_type=match.group(2),
-                        layer_info=match.group(3),
+                        step_type=match.group('start_type'),
+                        layer_info=match.group('start_layer'),
                         is_cached=False
                     )
                     
-            elif match := self.BUILDKIT_DONE_PATTERN.match(line):
-                step_id = f"#{match.group(1)}"
-                duration = self._parse_duration(match.group(2))
+            elif kind == 'done':
+                step_id = f"#{match.group('id')}"
+                duration = self._parse_duration(match.group('done_duration'))
                 if step_id in step_info:
                     step = step_info[step_id]
                     if not step.is_cached:
@@ -173,76 +243,27 @@ class DockerLogParser:
                             step.end_time = step.start_time + timedelta(seconds=duration)
                             self.relative_time_counter += duration
                         
-            elif match := self.BUILDKIT_PROGRESS_PATTERN.match(line):
-                step_id = f"#{match.group(1)}"
-                if step_id in step_info and not step_info[step_id].end_time:
-                    # Update progress
-                    pass
-                    
-            elif match := self.BUILDKIT_SIMPLE_PATTERN.match(line):
+            elif kind == 'simple':
                 # Handle simple pattern like "#1 [internal] load build definition from Dockerfile"
-                step_id = f"#{match.group(1)}"
+                step_id = f"#{match.group('id')}"
                 if step_id not in step_info:
                     step_info[step_id] = BuildStep(
                         step_id=step_id,
-                        description=match.group(3),
+                        description=match.group('simple_desc'),
                         start_time=timestamp or self.build_start_time or datetime.now(),
                         end_time=None,
                         duration=None,
-                        step_type=match.group(2),
+                        step_type=match.group('simple_type'),
                         layer_info="",
                         is_cached=False
                     )
                     
-            elif match := self.BUILDKIT_EXTRACTING_PATTERN.match(line):
-                # Handle extracting pattern
-                step_id = f"#{match.group(1)}"
-                if step_id in step_info:
-                    # Update existing step with extracting info
-                    if match.group(3):  # Has duration
-                        duration = self._parse_duration(match.group(3))
-                        step_info[step_id].duration = (step_info[step_id].duration or 0) + duration
-                        
-            elif match := self.BUILDKIT_LOADING_PATTERN.match(line):
-                # Handle loading pattern
-                step_id = f"#{match.group(1)}"
-                # Loading is part of an existing step, don't create new
-                
-            elif match := self.BUILDKIT_TRANSFERRING_PATTERN.match(line):
-                # Handle transferring pattern
-                step_id = f"#{match.group(1)}"
-                if step_id in step_info:
-                    # Update existing step
-                    pass
-                    
-            elif match := self.BUILDKIT_CONTINUATION_PATTERN.match(line):
-                # Handle continuation pattern
-                step_id = f"#{match.group(1)}"
-                # This is just a continuation marker, ignore
-                
-            elif line.strip().startswith('#') and ' ' in line:
-                # Fallback pattern for any #N lines we haven't caught
-                parts = line.strip().split(' ', 2)
-                if len(parts) >= 2 and parts[0].startswith('#'):
-                    try:
-                        step_num = int(parts[0][1:])
-                        step_id = f"#{step_num}"
-                        description = ' '.join(parts[1:]) if len(parts) > 1 else "Unknown"
-                        
-                        if step_id not in step_info:
-                            step_info[step_id] = BuildStep(
-                                step_id=step_id,
-                                description=description,
-                                start_time=timestamp or self.build_start_time or datetime.now(),
-                                end_time=None,
-                                duration=None,
-                                step_type="OTHER",
-                                layer_info="",
-                                is_cached=False
-                            )
-                    except ValueError:
-                        # Not a valid step number, ignore
-                        pass
+            elif kind == 'extracting':
+                # Update existing step with extracting info
+                step_id = f"#{match.group('id')}"
+                if step_id in step_info and match.group('extracting_duration'):
+                    duration = self._parse_duration(match.group('extracting_duration'))
+                    step_info[step_id].duration = (step_info[step_id].duration or 0) + duration
         
         # Calculate relative times if no absolute timestamps
         if not self.build_start_time:
@@ -250,29 +271,59 @@ class DockerLogParser:
             
         return list(step_info.values())
     
-    def _parse_legacy_logs(self, lines: List[str]) -> List[BuildStep]:
+    def _add_fallback_step(self, line: str, timestamp: Optional[datetime],
+                           step_info: Dict[str, BuildStep]) -> None:
+        """Record a generic step for a '#N ...' line no BuildKit pattern matched."""
+        if ' ' not in line:
+            return
+        parts = line.split(' ', 2)
+        try:
+            step_num = int(parts[0][1:])
+        except ValueError:
+            # Not a valid step number, ignore
+            return
+            
+        step_id = f"#{step_num}"
+        if step_id not in step_info:
+            step_info[step_id] = BuildStep(
+                step_id=step_id,
+                description=' '.join(parts[1:]),
+                start_time=timestamp or self.build_start_time or datetime.now(),
+                end_time=None,
+                duration=None,
+                step_type="OTHER",
+                layer_info="",
+                is_cached=False
+            )
+    
+    def _parse_legacy_logs(self, lines: Iterable[str]) -> List[BuildStep]:
         """Parse legacy Docker build format logs."""
-        steps = []
-        current_step = None
+        steps: List[BuildStep] = []
+        current_step: Optional[BuildStep] = None
         step_counter = 0
         
-        for i, line in enumerate(lines):
+        # Whether the previous line was output from the current step; a step
+        # line right after it marks when the current step finished
+        follows_output = False
+        
+        for line in lines:
             line = line.strip()
             if not line:
+                follows_output = False
                 continue
                 
-            # Extract timestamp
-            timestamp = self._extract_timestamp(line)
+            # Extract timestamp and remove it from line
+            timestamp, line = self._split_timestamp(line)
             if timestamp and not self.build_start_time:
                 self.build_start_time = timestamp
-                
-            # Remove timestamp from line
-            line = self.TIMESTAMP_PATTERN.sub('', line)
             
             # Match legacy patterns
             if match := self.LEGACY_STEP_PATTERN.match(line):
                 # Save previous step
                 if current_step:
+                    if follows_output and current_step.start_time and timestamp:
+                        current_step.end_time = timestamp
+                        current_step.duration = (timestamp - current_step.start_time).total_seconds()
                     steps.append(current_step)
                     
                 step_counter += 1
@@ -286,21 +337,16 @@ class DockerLogParser:
                     layer_info=match.group(1),
                     is_cached=False
                 )
+                follows_output = False
                 
             elif current_step and self.LEGACY_USING_CACHE_PATTERN.match(line):
                 current_step.is_cached = True
                 current_step.duration = 0.0
                 current_step.end_time = current_step.start_time
+                follows_output = False
                 
-            elif current_step and i < len(lines) - 1:
-                # Check if next line starts a new step
-                next_line = lines[i + 1].strip()
-                next_line = self.TIMESTAMP_PATTERN.sub('', next_line)
-                if self.LEGACY_STEP_PATTERN.match(next_line):
-                    next_timestamp = self._extract_timestamp(lines[i + 1])
-                    if current_step.start_time and next_timestamp:
-                        current_step.end_time = next_timestamp
-                        current_step.duration = (next_timestamp - current_step.start_time).total_seconds()
+            else:
+                follows_output = current_step is not None
         
         # Add last step
         if current_step:
@@ -308,20 +354,26 @@ class DockerLogParser:
             
         return steps
     
-    def _extract_timestamp(self, line: str) -> Optional[datetime]:
-        """Extract timestamp from log line."""
+    def _split_timestamp(self, line: str) -> Tuple[Optional[datetime], str]:
+        """Split a leading timestamp off a log line, returning (timestamp, rest)."""
+        # Timestamps start with a digit, so logs without them ('#N ...',
+        # 'Step N/M ...') never pay for the regex
+        if not line[:1].isdigit():
+            return None, line
         match = self.TIMESTAMP_PATTERN.match(line)
         if match:
-            try:
-                return date_parser.parse(match.group(1))
-            except:
-                pass
-        return None
+            return _parse_timestamp(match.group(1)), line[match.end():]
+        return None, line
     
     def _parse_duration(self, duration_str: str) -> float:
         """Parse duration string (e.g., '2.1s') to float seconds."""
         return float(duration_str.rstrip('s'))
     
+    def _step_number(self, step_id: str) -> int:
+        """Extract the number from a step ID such as '#12' or 'Step 3'."""
+        match = self.STEP_NUMBER_PATTERN.search(step_id)
+        return int(match.group()) if match else 0
+    
     def _calculate_relative_times(self, steps: List[BuildStep]) -> None:
         """Calculate relative times when no absolute timestamps are available."""
         if not steps:
@@ -332,7 +384,7 @@ class DockerLogParser:
         self.build_start_time = base_time
         
         # Sort steps by ID to get order
-        steps.sort(key=lambda s: int(s.step_id.lstrip('#Step ')))
+        steps.sort(key=lambda s: self._step_number(s.step_id))
         
         current_time = base_time
         for step in steps:
@@ -350,39 +402,135 @@ class DockerLogParser:
                     step.end_time = current_time + timedelta(seconds=1)
                     current_time = step.end_time
     
+    def _set_time_offsets(self, steps: List[BuildStep]) -> None:
+        """Store each step's start/end as float seconds since the build start."""
+        if not steps:
+            return
+            
+        base_time = self.build_start_time
+        if base_time is None:
+            try:
+                base_time = min(s.start_time for s in steps)
+            except TypeError:
+                # Naive and aware start times can't be ordered; measure from
+                # the first step, the rest of the steps are placed relative to it
+                base_time = steps[0].start_time
+                
+        for step in steps:
+            step.has_offsets = True
+            try:
+                step.start_s = (step.start_time - base_time).total_seconds()
+                step.end_s = (step.end_time - base_time).total_seconds() if step.end_time is not None else None
+            except TypeError:
+                # Naive datetime.now() fallback mixed with timezone-aware log
+                # timestamps, the step can't be placed on the build timeline
+                step.start_s = step.end_s = None
+    
     def detect_parallelism(self, steps: List[BuildStep]) -> Dict[str, List[str]]:
-        """Detect which steps run in parallel."""
-        parallel_groups = {}
+        """Detect which steps run in parallel.
+        
+        Builds with fewer than PARALLELISM_MATRIX_LIMIT steps compare all
+        pairs at once with NumPy; larger ones use a sweep line over start/end
+        events, which is O(N log N) plus the size of the output.
+        """
+        parallel_groups: Dict[str, List[str]] = {}
         
-        # Sort steps by start time, filtering out any with None start_time
+        # Filter out any steps with None start_time and compare float offsets
+        # rather than datetimes. Steps that did not come from parse_logs get
+        # their offsets filled in here; steps whose offsets could not be
+        # computed are skipped.
         valid_steps = [s for s in steps if s.start_time is not None]
-        sorted_steps = sorted(valid_steps, key=lambda s: s.start_time)
+        if not all(s.has_offsets for s in valid_steps):
+            self._set_time_offsets(valid_steps)
+            
+        # Sort steps by start time
+        sorted_steps = sorted(
+            ((s.start_s, s.end_s, s) for s in valid_steps if s.start_s is not None),
+            key=itemgetter(0)
+        )
+        intervals = [(start_s, end_s) for start_s, end_s, _ in sorted_steps]
         
-        for i, step in enumerate(sorted_steps):
-            parallel_with = []
-            for j, other in enumerate(sorted_steps):
-                if i != j and self._steps_overlap(step, other):
-                    parallel_with.append(other.step_id)
+        if len(intervals) < self.PARALLELISM_MATRIX_LIMIT:
+            overlaps = self._overlaps_matrix(intervals)
+        else:
+            overlaps = self._overlaps_sweep(intervals)
             
-            if parallel_with:
-                parallel_groups[step.step_id] = parallel_with
+        # Report in start-time order to match the step ordering used elsewhere
+        for i, (_, _, step) in enumerate(sorted_steps):
+            if overlaps[i]:
+                parallel_groups[step.step_id] = [sorted_steps[j][2].step_id for j in overlaps[i]]
                 
         return parallel_groups
     
-    def _steps_overlap(self, step1: BuildStep, step2: BuildStep) -> bool:
-        """Check if two steps overlap in time."""
-        if not all([step1.start_time, step1.end_time, step2.start_time, step2.end_time]):
-            return False
-            
-        return not (step1.end_time <= step2.start_time or step2.end_time <= step1.start_time)
+    def _overlaps_matrix(self, intervals: List[Tuple[float, Optional[float]]]) -> List[List[int]]:
+        """Find overlapping intervals by comparing all pairs with NumPy broadcasting."""
+        starts = np.array([start_s for start_s, _ in intervals], dtype=np.float64)
+        # NaN compares false, so steps without an end never overlap anything
+        ends = np.array([np.nan if end_s is None else end_s for _, end_s in intervals], dtype=np.float64)
+        
+        mask = (starts[:, None] < ends[None, :]) & (ends[:, None] > starts[None, :])
+        np.fill_diagonal(mask, False)
+        return [np.flatnonzero(row).tolist() for row in mask]
+    
+    def _overlaps_sweep(self, intervals: List[Tuple[float, Optional[float]]]) -> List[List[int]]:
+        """Find overlapping intervals with a sweep line over start/end events."""
+        # Event kinds at the same instant: ends first so touching steps don't
+        # overlap, then zero-length steps, then starts.
+        events: List[Tuple[float, int, int]] = []
+        inverted: List[int] = []
+        for i, (start_s, end_s) in enumerate(intervals):
+            if end_s is None:
+                continue
+            if end_s > start_s:
+                events.append((start_s, 2, i))
+                events.append((end_s, 0, i))
+            elif end_s == start_s:
+                events.append((start_s, 1, i))
+            else:
+                inverted.append(i)
+        events.sort()
+        
+        overlaps: List[List[int]] = [[] for _ in intervals]
+        active: Set[int] = set()
+        for _, kind, i in events:
+            if kind == 0:
+                active.discard(i)
+                continue
+            for other in active:
+                overlaps[i].append(other)
+                overlaps[other].append(i)
+            if kind == 2:
+                active.add(i)
+                
+        # Steps ending before they start (out-of-order legacy timestamps) are
+        # rare; check them against every step with the plain pairwise test,
+        # steps i and j overlap when e_i > s_j and e_j > s_i
+        if inverted:
+            starts = np.array([start_s for start_s, _ in intervals], dtype=np.float64)
+            ends = np.array([np.nan if end_s is None else end_s for _, end_s in intervals], dtype=np.float64)
+            is_inverted = ends < starts
+            for i in inverted:
+                hits = (ends[i] > starts) & (ends > starts[i])
+                # Pairs of inverted steps are added once, from the lower index
+                hits[:i + 1] &= ~is_inverted[:i + 1]
+                for other in np.flatnonzero(hits).tolist():
+                    overlaps[i].append(other)
+                    overlaps[other].append(i)
+        
+        for group in overlaps:
+            group.sort()
+        return overlaps
     
     def identify_bottlenecks(self, steps: List[BuildStep], threshold_percentile: float = 75) -> List[BuildStep]:
         """Identify bottleneck steps based on duration."""
-        non_cached_steps = [s for s in steps if not s.is_cached and s.duration is not None]
-        if not non_cached_steps:
+        timed_steps = [(s, s.duration) for s in steps if not s.is_cached and s.duration is not None]
+        if not timed_steps:
             return []
             
-        durations = [s.duration for s in non_cached_steps]
-        threshold = sorted(durations)[int(len(durations) * threshold_percentile / 100)]
+        # Select the percentile element with an O(N) partition rather than
+        # sorting every duration
+        durations = np.fromiter((d for _, d in timed_steps), dtype=np.float64, count=len(timed_steps))
+        index = int(len(durations) * threshold_percentile / 100)
+        threshold = float(np.partition(durations, index)[index])
         
-        return [s for s in non_cached_steps if s.duration >= threshold]
\ No newline at end of file
+        return [s for s, d in timed_steps if d >= threshold]
\ No newline at end of file
@@ -1,11 +1,82 @@
+import heapq
+import re
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import pandas as pd
-from datetime import datetime
-from typing import List, Dict, Optional
+import numpy as np
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import AbstractSet, Any, FrozenSet, List, Dict, Optional, Tuple
 from log_parser import BuildStep
 
 
+# Dockerfile instructions recognised as step types, matched case-insensitively
+# at the start of the description
+_TYPE_RE = re.compile(r'^(RUN|COPY|FROM|WORKDIR|ENV|ARG|USER|ADD|EXPOSE)', re.IGNORECASE)
+
+# The longest instruction above; no match can look further into a description
+_TYPE_PREFIX_LEN = len('WORKDIR')
+
+
+@lru_cache(maxsize=1024)
+def _step_type_of_prefix(prefix: str) -> str:
+    """Classify a description prefix; memoised as build steps repeat instructions."""
+    match = _TYPE_RE.match(prefix)
+    return match.group(1).upper() if match else 'OTHER'
+
+
+def _to_microseconds(times: List[datetime]) -> np.ndarray:
+    """Convert datetimes to int64 microseconds, aware ones via UTC, for ordering."""
+    return np.array(
+        [t.astimezone(timezone.utc).replace(tzinfo=None) if t.tzinfo else t for t in times],
+        dtype='datetime64[us]'
+    ).astype(np.int64)
+
+
+def _schedule_lanes(starts_us: np.ndarray, ends_us: np.ndarray) -> np.ndarray:
+    """Give each interval, in start order, the lowest lane free at its start."""
+    # Busy lanes sit in a heap keyed by end time, lanes free again in a heap
+    # of indices, so each interval costs O(log lanes)
+    lanes = np.empty(len(starts_us), dtype=np.int32)
+    busy_lanes: List[Tuple[int, int]] = []
+    free_lanes: List[int] = []
+    lane_count = 0
+    
+    for i, (start, end) in enumerate(zip(starts_us.tolist(), ends_us.tolist())):
+        while busy_lanes and busy_lanes[0][0] <= start:
+            heapq.heappush(free_lanes, heapq.heappop(busy_lanes)[1])
+            
+        if free_lanes:
+            lane = heapq.heappop(free_lanes)
+        else:
+            lane = lane_count
+            lane_count += 1
+            
+        heapq.heappush(busy_lanes, (end, lane))
+        lanes[i] = lane
+        
+    return lanes
+
+
+@dataclass(slots=True)
+class StepArrays:
+    """Per-step chart values, one array per field in step order."""
+    start_times: np.ndarray
+    end_times: np.ndarray
+    y_positions: np.ndarray
+    colors: np.ndarray
+    labels: np.ndarray
+    hover_texts: np.ndarray
+
+
+@dataclass(slots=True, frozen=True)
+class ChartLabels:
+    """Summary of the inputs a chart was drawn from, compared by update()."""
+    steps: Tuple[Tuple[Any, ...], ...]
+    parallel_groups: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    bottlenecks: FrozenSet[str]
+
+
 class BuildWaterfallVisualizer:
     """Create interactive Gantt chart visualization for Docker build steps."""
     
@@ -23,70 +94,161 @@ class BuildWaterfallVisualizer:
         'bottleneck': '#DC143C'  # Crimson
     }
     
+    # Colors resolve through integer type ids indexing a lookup table
+    _TYPE_IDS = {step_type: i for i, step_type in enumerate(COLOR_SCHEME)}
+    _COLOR_LUT = np.array(list(COLOR_SCHEME.values()))
+    
+    # Steps shorter than this fraction of the whole build get no text label
+    MIN_LABEL_FRACTION = 0.01
+    
+    # Above this many steps, draw with WebGL instead of SVG bars and leave
+    # out the per-step text labels
+    WEBGL_THRESHOLD = 2000
+    
+    # WebGL charts are sized by lane and kept well inside browser canvas limits
+    WEBGL_MAX_HEIGHT = 8000
+    
     def __init__(self):
         self.fig = None
+        # Labels of the inputs self.fig was drawn from, see _chart_labels()
+        self._labels: Optional[ChartLabels] = None
         
     def create_waterfall_chart(self, 
                               steps: List[BuildStep], 
                               parallel_groups: Optional[Dict[str, List[str]]] = None,
                               bottlenecks: Optional[List[BuildStep]] = None) -> go.Figure:
         """Create an interactive Gantt chart showing build steps."""
+        # Labels are only worked out by update(), which reuses the figure
+        return self._build_chart(steps, parallel_groups, bottlenecks, None)
+    
+    def _build_chart(self, 
+                     steps: List[BuildStep], 
+                     parallel_groups: Optional[Dict[str, List[str]]],
+                     bottlenecks: Optional[List[BuildStep]],
+                     labels: Optional[ChartLabels]) -> go.Figure:
+        """Build the chart from scratch, remembering the labels of its inputs."""
+        self._labels = None
         if not steps:
             return self._create_empty_chart()
             
         # Prepare data for visualization
-        df_data = self._prepare_dataframe(steps, parallel_groups, bottlenecks)
+        arrays = self._prepare_arrays(steps, parallel_groups, bottlenecks)
         
         # Create the figure
         self.fig = go.Figure()
         
-        # Add traces for each step
-        for _, row in df_data.iterrows():
-            self._add_step_trace(row)
+        # Draw the steps as bars of one trace and label them, or for very
+        # large builds as WebGL lines without labels
+        use_webgl = len(steps) > self.WEBGL_THRESHOLD
+        if use_webgl:
+            self._add_step_segments(arrays)
+        else:
+            self._add_step_bars(arrays)
+            self._add_step_labels(arrays)
             
         # Update layout
-        self._update_layout(df_data)
+        self._update_layout(arrays, use_webgl)
         
+        self._labels = labels
         return self.fig
     
-    def _prepare_dataframe(self, 
-                          steps: List[BuildStep], 
-                          parallel_groups: Optional[Dict[str, List[str]]],
-                          bottlenecks: Optional[List[BuildStep]]) -> pd.DataFrame:
-        """Prepare DataFrame for visualization."""
-        data = []
+    def update(self, 
+               steps: List[BuildStep], 
+               parallel_groups: Optional[Dict[str, List[str]]] = None,
+               bottlenecks: Optional[List[BuildStep]] = None) -> go.Figure:
+        """Update the chart for new inputs, reusing the cached figure where possible."""
+        labels = self._chart_labels(steps, parallel_groups, bottlenecks)
+        previous = self._labels
+        if (self.fig is None or previous is None
+                or labels.steps != previous.steps
+                or labels.parallel_groups != previous.parallel_groups):
+            return self._build_chart(steps, parallel_groups, bottlenecks, labels)
+            
+        # Only the bottlenecks changed, which affects nothing but bar colors.
+        # WebGL charts group steps into traces by color, so they are rebuilt.
+        if labels.bottlenecks != previous.bottlenecks:
+            if len(steps) > self.WEBGL_THRESHOLD:
+                return self._build_chart(steps, parallel_groups, bottlenecks, labels)
+                
+            colors = self._step_colors(steps, labels.bottlenecks)
+            self.fig.update_traces(
+                marker=dict(color=colors, line=dict(color=colors)),
+                selector=dict(type='bar')
+            )
+            self._labels = labels
+            
+        return self.fig
+    
+    def _chart_labels(self, 
+                      steps: List[BuildStep], 
+                      parallel_groups: Optional[Dict[str, List[str]]],
+                      bottlenecks: Optional[List[BuildStep]]) -> ChartLabels:
+        """Summarise the chart inputs so update() can tell what changed."""
+        return ChartLabels(
+            steps=tuple(
+                (step.step_id, step.description, step.start_time, step.end_time,
+                 step.duration, step.step_type, step.layer_info, step.is_cached)
+                for step in steps
+            ),
+            parallel_groups=tuple(
+                (step_id, tuple(parallel_with))
+                for step_id, parallel_with in (parallel_groups or {}).items()
+            ),
+            bottlenecks=frozenset(b.step_id for b in (bottlenecks or []))
+        )
+    
+    def _prepare_arrays(self, 
+                        steps: List[BuildStep], 
+                        parallel_groups: Optional[Dict[str, List[str]]],
+                        bottlenecks: Optional[List[BuildStep]]) -> StepArrays:
+        """Prepare per-step arrays for visualization."""
         bottleneck_ids = {b.step_id for b in (bottlenecks or [])}
         
         # Assign Y-positions based on parallelism
         y_positions = self._calculate_y_positions(steps, parallel_groups)
         
-        for step in steps:
-            # Determine color
-            if step.step_id in bottleneck_ids:
-                color = self.COLOR_SCHEME['bottleneck']
-            elif step.is_cached:
-                color = self.COLOR_SCHEME['cached']
-            else:
-                step_type = self._extract_step_type(step.description)
-                color = self.COLOR_SCHEME.get(step_type, self.COLOR_SCHEME['OTHER'])
-            
-            # Create hover text
-            hover_text = self._create_hover_text(step, parallel_groups)
-            
-            data.append({
-                'step_id': step.step_id,
-                'description': step.description[:50] + '...' if len(step.description) > 50 else step.description,
-                'start_time': step.start_time,
-                'end_time': step.end_time or step.start_time,
-                'duration': step.duration or 0,
-                'y_position': y_positions.get(step.step_id, 0),
-                'color': color,
-                'hover_text': hover_text,
-                'is_cached': step.is_cached,
-                'is_bottleneck': step.step_id in bottleneck_ids
-            })
+        # Times are kept as millisecond datetime64 in wall-clock time (Plotly
+        # ignores UTC offsets anyway) and lanes as int32, so both reach
+        # Plotly as NumPy arrays rather than lists of Python objects
+        start_times = np.array(
+            [step.start_time.replace(tzinfo=None) for step in steps], dtype='datetime64[ms]'
+        )
+        end_times = np.array(
+            [(step.end_time or step.start_time).replace(tzinfo=None) for step in steps],
+            dtype='datetime64[ms]'
+        )
+        
+        # 'YYYY-MM-DDTHH:MM:SS.mmm' -> 'HH:MM:SS.mmm'
+        start_texts = np.datetime_as_string(start_times, unit='ms')
+        hover_texts = [
+            self._create_hover_text(step, parallel_groups, start_text[11:])
+            for step, start_text in zip(steps, start_texts)
+        ]
         
-        return pd.DataFrame(data)
+        return StepArrays(
+            start_times=start_times,
+            end_times=end_times,
+            y_positions=np.array([y_positions.get(step.step_id, 0) for step in steps], dtype=np.int32),
+            colors=self._step_colors(steps, bottleneck_ids),
+            labels=np.array([
+                step.description[:50] + '...' if len(step.description) > 50 else step.description
+                for step in steps
+            ], dtype=object),
+            hover_texts=np.array(hover_texts, dtype=object)
+        )
+    
+    def _step_colors(self, steps: List[BuildStep], bottleneck_ids: AbstractSet[str]) -> np.ndarray:
+        """Determine colors for all steps at once; bottlenecks win over cached."""
+        other_id = self._TYPE_IDS['OTHER']
+        type_ids = np.array([
+            self._TYPE_IDS.get(self._extract_step_type(step.description), other_id)
+            for step in steps
+        ], dtype=np.intp)
+        is_cached = np.array([step.is_cached for step in steps], dtype=bool)
+        is_bottleneck = np.array([step.step_id in bottleneck_ids for step in steps], dtype=bool)
+        type_ids = np.where(is_cached, self._TYPE_IDS['cached'], type_ids)
+        type_ids = np.where(is_bottleneck, self._TYPE_IDS['bottleneck'], type_ids)
+        return self._COLOR_LUT[type_ids]
     
     def _calculate_y_positions(self, 
                               steps: List[BuildStep], 
@@ -94,97 +256,145 @@ class BuildWaterfallVisualizer:
         """Calculate Y-positions to show parallel steps on different lanes."""
         y_positions = {}
         
+        # Order by start time; microseconds also order naive and aware times
+        starts_us = _to_microseconds([step.start_time for step in steps])
+        order = np.argsort(starts_us, kind='stable')
+        
         if not parallel_groups:
             # No parallelism info - stack sequentially
-            sorted_steps = sorted(steps, key=lambda s: s.start_time)
-            for i, step in enumerate(sorted_steps):
-                y_positions[step.step_id] = i
+            for lane, i in enumerate(order.tolist()):
+                y_positions[steps[i].step_id] = lane
         else:
             # Assign lanes based on parallelism
-            lanes_in_use = []
-            sorted_steps = sorted(steps, key=lambda s: s.start_time)
+            ends_us = _to_microseconds([step.end_time or step.start_time for step in steps])
+            lanes = _schedule_lanes(starts_us[order], ends_us[order])
             
-            for step in sorted_steps:
-                # Find first available lane
-                lane = 0
-                for existing_lane, (_, end_time) in enumerate(lanes_in_use):
-                    if step.start_time >= end_time:
-                        lane = existing_lane
-                        break
-                else:
-                    lane = len(lanes_in_use)
-                    lanes_in_use.append((step.step_id, step.end_time))
-                
-                if lane < len(lanes_in_use):
-                    lanes_in_use[lane] = (step.step_id, step.end_time)
-                    
-                y_positions[step.step_id] = lane
+            for i, lane in zip(order.tolist(), lanes.tolist()):
+                y_positions[steps[i].step_id] = lane
                 
         return y_positions
     
     def _extract_step_type(self, description: str) -> str:
         """Extract step type from description."""
-        keywords = ['RUN', 'COPY', 'FROM', 'WORKDIR', 'ENV', 'ARG', 'USER', 'ADD', 'EXPOSE']
-        
-        for keyword in keywords:
-            if description.upper().startswith(keyword):
-                return keyword
-                
-        return 'OTHER'
+        return _step_type_of_prefix(description[:_TYPE_PREFIX_LEN])
     
     def _create_hover_text(self, 
                           step: BuildStep, 
-                          parallel_groups: Optional[Dict[str, List[str]]]) -> str:
-        """Create detailed hover text for a step."""
+                          parallel_groups: Optional[Dict[str, List[str]]],
+                          start_text: str) -> str:
+        """Create detailed hover text for a step, given its formatted start time."""
         lines = [
             f"<b>{step.step_id}</b>",
             f"<b>Description:</b> {step.description}",
-            f"<b>Start:</b> {step.start_time.strftime('%H:%M:%S.%f')[:-3]}",
+            f"<b>Start:</b> {start_text}",
             f"<b>Duration:</b> {step.duration:.2f}s" if step.duration else "<b>Duration:</b> N/A",
-            f"<b>Type:</b> {step.step_type}",
-            f"<b>Layer:</b> {step.layer_info}" if step.layer_info else "",
-            f"<b>Cached:</b> {'Yes' if step.is_cached else 'No'}"
+            f"<b>Type:</b> {step.step_type}"
         ]
+        if step.layer_info:
+            lines.append(f"<b>Layer:</b> {step.layer_info}")
+        lines.append(f"<b>Cached:</b> {'Yes' if step.is_cached else 'No'}")
         
         if parallel_groups and step.step_id in parallel_groups:
             parallel_with = ', '.join(parallel_groups[step.step_id])
             lines.append(f"<b>Parallel with:</b> {parallel_with}")
             
-        return '<br>'.join(filter(None, lines))
+        return '<br>'.join(lines)
     
-    def _add_step_trace(self, row: pd.Series) -> None:
-        """Add a trace for a single step."""
-        # Create a box shape for the step
-        self.fig.add_trace(go.Scatter(
-            x=[row['start_time'], row['end_time'], row['end_time'], row['start_time'], row['start_time']],
-            y=[row['y_position'] - 0.4, row['y_position'] - 0.4, 
-               row['y_position'] + 0.4, row['y_position'] + 0.4, row['y_position'] - 0.4],
-            fill='toself',
-            fillcolor=row['color'],
-            line=dict(color=row['color'], width=1),
-            hovertext=row['hover_text'],
+    def _add_step_bars(self, arrays: StepArrays) -> None:
+        """Add all steps as horizontal bars of a single trace."""
+        # One trace keeps Plotly's render cost flat in the number of steps.
+        # On a date axis a bar's length is given in milliseconds from its base.
+        durations_ms = (arrays.end_times - arrays.start_times).astype(np.int64)
+        self.fig.add_trace(go.Bar(
+            base=arrays.start_times,
+            x=durations_ms,
+            y=arrays.y_positions,
+            orientation='h',
+            width=0.8,
+            marker=dict(color=arrays.colors, line=dict(color=arrays.colors, width=1)),
+            hovertext=arrays.hover_texts,
             hoverinfo='text',
-            name=row['step_id'],
-            showlegend=False,
-            mode='lines'
+            name='Build steps',
+            showlegend=False
         ))
         
-        # Add text label
-        self.fig.add_annotation(
-            x=row['start_time'] + (row['end_time'] - row['start_time']) / 2,
-            y=row['y_position'],
-            text=row['description'],
-            showarrow=False,
-            font=dict(size=10),
-            xanchor='center',
-            yanchor='middle'
-        )
+    def _add_step_segments(self, arrays: StepArrays) -> None:
+        """Add steps as WebGL line segments, one trace per color, for very large builds."""
+        # SVG bars stop scaling at thousands of steps; a thick WebGL line per
+        # step, broken by NaT/NaN gaps, keeps rendering fast
+        for color in np.unique(arrays.colors):
+            mask = arrays.colors == color
+            y_positions = arrays.y_positions[mask]
+            
+            # Fill (start, end, gap) triples straight into preallocated buffers
+            xs = np.empty(3 * len(y_positions), dtype='datetime64[ms]')
+            xs[0::3] = arrays.start_times[mask]
+            xs[1::3] = arrays.end_times[mask]
+            xs[2::3] = np.datetime64('NaT')
+            ys = np.empty(3 * len(y_positions), dtype=np.float32)
+            ys[0::3] = y_positions
+            ys[1::3] = y_positions
+            ys[2::3] = np.nan
+            # Gap points can't be hovered, so they carry no text
+            hover_texts = np.full(3 * len(y_positions), None, dtype=object)
+            hover_texts[0::3] = arrays.hover_texts[mask]
+            hover_texts[1::3] = arrays.hover_texts[mask]
+            
+            # Zero-length steps (cached ones, or those without an end) draw no
+            # line, so they get a marker on their start point instead
+            zero_length = arrays.end_times[mask] == arrays.start_times[mask]
+            marker_sizes = np.zeros(3 * len(y_positions), dtype=np.float32)
+            marker_sizes[0::3] = np.where(zero_length, 8, 0)
+            
+            self.fig.add_trace(go.Scattergl(
+                x=xs,
+                y=ys,
+                mode='lines+markers' if zero_length.any() else 'lines',
+                line=dict(color=color, width=6),
+                marker=dict(color=color, size=marker_sizes),
+                hovertext=hover_texts,
+                hoverinfo='text',
+                name='Build steps',
+                showlegend=False
+            ))
     
-    def _update_layout(self, df: pd.DataFrame) -> None:
+    def _add_step_labels(self, arrays: StepArrays) -> None:
+        """Add text labels for all steps in a single layout update."""
+        start_times = arrays.start_times
+        end_times = arrays.end_times
+        durations = end_times - start_times
+        midpoints = start_times + durations / 2
+        
+        # Labels on steps this short would be unreadable, so leave them out
+        visible = durations >= (end_times.max() - start_times.min()) * self.MIN_LABEL_FRACTION
+        
+        annotations = [
+            dict(
+                x=x,
+                y=y,
+                text=text,
+                showarrow=False,
+                font=dict(size=10),
+                xanchor='center',
+                yanchor='middle'
+            )
+            for x, y, text in zip(midpoints[visible].tolist(),
+                                  arrays.y_positions[visible].tolist(),
+                                  arrays.labels[visible])
+        ]
+        self.fig.update_layout(annotations=annotations)
+    
+    def _update_layout(self, arrays: StepArrays, use_webgl: bool = False) -> None:
         """Update figure layout."""
+        if use_webgl:
+            lane_count = int(arrays.y_positions.max()) + 1
+            height = min(self.WEBGL_MAX_HEIGHT, max(600, 50 * lane_count))
+        else:
+            height = max(600, 50 * len(arrays.y_positions))
+            
         # Calculate time range
-        min_time = df['start_time'].min()
-        max_time = df['end_time'].max()
+        min_time = arrays.start_times.min()
+        max_time = arrays.end_times.max()
         time_buffer = (max_time - min_time) * 0.05
         
         self.fig.update_layout(
@@ -195,39 +405,44 @@ class BuildWaterfallVisualizer:
             xaxis=dict(
                 title='Time',
                 type='date',
-                range=[min_time - time_buffer, max_time + time_buffer],
+                range=[(min_time - time_buffer).item(), (max_time + time_buffer).item()],
                 showgrid=True,
                 gridwidth=1,
                 gridcolor='LightGray'
             ),
             yaxis=dict(
                 title='Build Steps',
-                range=[-1, df['y_position'].max() + 1],
+                range=[-1, int(arrays.y_positions.max()) + 1],
                 showticklabels=False,
                 showgrid=False
             ),
             hovermode='closest',
-            height=max(600, 50 * len(df)),
+            height=height,
             plot_bgcolor='white',
-            showlegend=True
+            showlegend=False,
+            # Room on the right for the legend annotation below
+            margin=dict(r=120)
         )
         
-        # Add legend items
+        # Add the legend as one annotation with a colored swatch per entry,
+        # rather than an empty dummy trace per entry
         legend_items = [
             ('Cached', self.COLOR_SCHEME['cached']),
             ('Running', self.COLOR_SCHEME['RUN']),
             ('Bottleneck', self.COLOR_SCHEME['bottleneck'])
         ]
-        
-        for i, (label, color) in enumerate(legend_items):
-            self.fig.add_trace(go.Scatter(
-                x=[None],
-                y=[None],
-                mode='markers',
-                marker=dict(size=10, color=color),
-                showlegend=True,
-                name=label
-            ))
+        self.fig.add_annotation(
+            text='<br>'.join(f"<span style='color:{color}'>■</span> {label}" for label, color in legend_items),
+            xref="paper",
+            yref="paper",
+            x=1.02,
+            y=1,
+            showarrow=False,
+            font=dict(size=12),
+            xanchor='left',
+            yanchor='top',
+            align='left'
+        )
     
     def _create_empty_chart(self) -> go.Figure:
         """Create an empty chart when no data is available."""
@@ -253,11 +468,18 @@ class BuildWaterfallVisualizer:
         if not self.fig or not steps:
             return
             
-        # Calculate statistics
+        # Calculate statistics in a single pass
         total_steps = len(steps)
-        cached_steps = len([s for s in steps if s.is_cached])
-        total_duration = sum(s.duration or 0 for s in steps)
-        avg_duration = total_duration / len([s for s in steps if s.duration]) if steps else 0
+        cached_steps = 0
+        timed_steps = 0
+        total_duration = 0.0
+        for step in steps:
+            if step.is_cached:
+                cached_steps += 1
+            if step.duration:
+                timed_steps += 1
+                total_duration += step.duration
+        avg_duration = total_duration / timed_steps if timed_steps else 0
         
         # Add annotations
         stats_text = (